@@ -0,0 +1,139 @@
+import exact_cover as ec
+import time
+import numpy as np
+
+# Benchmarks for the generic exact cover solver, on problems other than sudoku.
+
+PENTOMINOES = {
+    "F": [(1, 0), (2, 0), (0, 1), (1, 1), (1, 2)],
+    "I": [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4)],
+    "L": [(0, 0), (0, 1), (0, 2), (0, 3), (1, 3)],
+    "N": [(1, 0), (1, 1), (0, 2), (1, 2), (0, 3)],
+    "P": [(0, 0), (1, 0), (0, 1), (1, 1), (0, 2)],
+    "T": [(0, 0), (1, 0), (2, 0), (1, 1), (1, 2)],
+    "U": [(0, 0), (2, 0), (0, 1), (1, 1), (2, 1)],
+    "V": [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2)],
+    "W": [(0, 0), (0, 1), (1, 1), (1, 2), (2, 2)],
+    "X": [(1, 0), (0, 1), (1, 1), (2, 1), (1, 2)],
+    "Y": [(1, 0), (0, 1), (1, 1), (1, 2), (1, 3)],
+    "Z": [(0, 0), (1, 0), (1, 1), (1, 2), (2, 2)],
+}
+
+
+def n_queens_rows(n: int) -> ([[int]], [int]):
+    """
+    Build the exact cover matrix for placing n queens on an n x n board.
+    Ranks and files are primary columns, diagonals are secondary.
+    :param n: Size of board
+    :return: Column-index list for each square, and the secondary columns
+    """
+    n_diagonals = 2 * n - 1
+
+    rows = []
+    for r in range(n):
+        for c in range(n):
+            rows.append([
+                # Every rank must have a queen
+                r,
+                # Every file must have a queen
+                n + c,
+                # Every diagonal may have at most one queen
+                2 * n + r + c,
+                # Every anti-diagonal may have at most one queen
+                2 * n + n_diagonals + r - c + n - 1
+            ])
+
+    secondary = range(2 * n, 2 * n + 2 * n_diagonals)
+    return rows, secondary
+
+
+def orientations(cells: [(int, int)]) -> [[(int, int)]]:
+    """
+    Every distinct rotation and reflection of a piece, moved to touch the origin.
+    :param cells: (x, y) cells of the piece
+    :return: List of orientations
+    """
+    result = set()
+    for _ in range(2):
+        for _ in range(4):
+            # Rotate by 90 degrees
+            cells = [(y, -x) for x, y in cells]
+            min_x = min(x for x, _ in cells)
+            min_y = min(y for _, y in cells)
+            result.add(tuple(sorted((x - min_x, y - min_y) for x, y in cells)))
+
+        # Reflect
+        cells = [(-x, y) for x, y in cells]
+
+    return sorted(result)
+
+
+def pentomino_rows(width: int, height: int) -> [[int]]:
+    """
+    Build the exact cover matrix for tiling a width x height board with the 12 pentominoes.
+    Columns 0-11 are the pieces, followed by one column per square of the board.
+    :param width: Width of board
+    :param height: Height of board
+    :return: Column-index list for each placement of each piece
+    """
+    rows = []
+    for piece, cells in enumerate(PENTOMINOES.values()):
+        for shape in orientations(cells):
+            for y in range(height):
+                for x in range(width):
+                    squares = [(x + dx, y + dy) for dx, dy in shape]
+                    if all(sx < width and sy < height for sx, sy in squares):
+                        rows.append([piece] + [len(PENTOMINOES) + sy * width + sx for sx, sy in squares])
+
+    return rows
+
+
+def bench(name: str, func) -> None:
+    """
+    Time a single run of func, and print the result
+    :param name: Name of the benchmark
+    :param func: Function to time
+    :return: None
+    """
+    start_time = time.process_time()
+    result = func()
+    end_time = time.process_time()
+    print(f"{name}: {result} ({end_time - start_time:.4f} seconds)")
+
+
+def bench_n_queens() -> None:
+    for n in (8, 10):
+        rows, secondary = n_queens_rows(n)
+        bench(f"{n}-queens, count", lambda: ec.solve(rows, secondary, mode="count"))
+
+    rows, secondary = n_queens_rows(30)
+    bench("30-queens, first", lambda: len(ec.solve(rows, secondary, mode="first")))
+
+
+def bench_pentomino() -> None:
+    # 3x20 has 2 tilings, each found in 4 reflections
+    rows = pentomino_rows(20, 3)
+    bench("Pentomino 20x3, count", lambda: ec.solve(rows, mode="count"))
+
+    rows = pentomino_rows(10, 6)
+    bench("Pentomino 10x6, first", lambda: len(ec.solve(rows, mode="first")))
+
+
+def bench_sudoku(difficulties=None) -> None:
+    if difficulties is None:
+        difficulties = ['very_easy', 'easy', 'medium', 'hard']
+
+    for difficulty in difficulties:
+        sudokus = np.load(f"data/{difficulty}_puzzle.npy")
+        solutions = np.load(f"data/{difficulty}_solution.npy")
+
+        bench(f"Sudoku {difficulty}, correct", lambda: sum(
+            np.array_equal(ec.sudoku_solver(sudoku.copy()), solution)
+            for sudoku, solution in zip(sudokus, solutions)
+        ))
+
+
+if __name__ == "__main__":
+    bench_n_queens()
+    bench_pentomino()
+    bench_sudoku()
@@ -0,0 +1,239 @@
+import exact_cover as ec
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from multiprocessing import Pool
+
+# Solves large CSV corpora of sudokus (such as data/sudoku.csv), in chunks that are checkpointed so that an
+# interrupted run can carry on where it stopped.
+
+
+def count_rows(csv_path: str) -> int:
+    """
+    Count the sudokus in a CSV file, without reading it all into memory
+    :param csv_path: CSV file with a header line, then one "quiz,solution" line per sudoku
+    :return: Number of sudokus
+    """
+    n_lines = 0
+    last = b"\n"
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            n_lines += block.count(b"\n")
+            last = block[-1:]
+
+    # The last line may not end with a newline. Don't count the header.
+    return max(n_lines + (last != b"\n") - 1, 0)
+
+
+def read_chunk(f, chunk_size: int) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Read the next chunk of sudokus from an open CSV file
+    :param f: CSV file, opened in binary mode and positioned at the start of a line
+    :param chunk_size: Maximum number of sudokus to read
+    :return: Quizzes and solutions, as (n, 81) arrays, and which lines were well formed
+    """
+    lines = []
+    for _ in range(chunk_size):
+        line = f.readline()
+        if not line:
+            break
+        lines.append(line.strip())
+
+    # A well formed line is 81 digits, a comma, then 81 more digits
+    valid = np.array([len(line) == 163 and line[81:82] == b"," for line in lines], dtype=bool)
+
+    # Malformed lines are parsed as an empty sudoku, so the rest of the chunk can still be read
+    grids = np.frombuffer(
+        b"".join(line if ok else b"0" * 163 for line, ok in zip(lines, valid)), dtype=np.uint8
+    ).reshape(len(lines), 163).astype(np.int8) - ord("0")
+
+    quizzes = grids[:, :81]
+    solutions = grids[:, 82:]
+    valid &= ((quizzes >= 0) & (quizzes <= 9) & (solutions >= 0) & (solutions <= 9)).all(axis=1)
+
+    quizzes[~valid] = 0
+    solutions[~valid] = 0
+    return quizzes, solutions, valid
+
+
+def hash_bytes(f, start: int, end: int, digest) -> None:
+    """
+    Add a range of an open file to a hash, reading it in blocks
+    :param f: File, opened in binary mode
+    :param start: Offset of the first byte to hash
+    :param end: Offset after the last byte to hash
+    :param digest: hashlib object to update
+    :return: None
+    """
+    f.seek(start)
+    while start < end:
+        block = f.read(min(1 << 20, end - start))
+        if not block:
+            break
+        digest.update(block)
+        start += len(block)
+
+
+def _solve_flat(quiz: np.ndarray) -> np.ndarray:
+    return ec.sudoku_solver(quiz.reshape(9, 9).astype(int)).reshape(81)
+
+
+def load_checkpoint(checkpoint_path: str) -> dict or None:
+    """
+    Load the progress saved by a previous run
+    :param checkpoint_path: Path to checkpoint file
+    :return: Saved progress, or None if there is no checkpoint
+    """
+    if not os.path.exists(checkpoint_path):
+        return None
+
+    with open(checkpoint_path, "r") as f:
+        return json.load(f)
+
+
+def save_checkpoint(checkpoint_path: str, progress: dict) -> None:
+    """
+    Save progress, replacing the previous checkpoint atomically so a kill can't leave it half written
+    :param checkpoint_path: Path to checkpoint file
+    :param progress: Progress to save
+    :return: None
+    """
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+def bulk_solve(csv_path: str = "data/sudoku.csv", output_path: str = "data/sudoku_solved.npy",
+               chunk_size: int = 10000, processes: int = None, limit: int = None) -> dict:
+    """
+    Solve every sudoku in a CSV corpus, resuming from the last checkpoint if there is one.
+    Solutions are written to a memory-mapped (n, 81) .npy file, in the same order as the CSV.
+    Progress is checkpointed to output_path + ".checkpoint" after every chunk, along with the CSV's size, row count
+    and a hash of the lines solved so far, so resuming with a different or changed CSV is an error.
+    Wrong solutions, and lines that aren't a well formed "quiz,solution" pair, are appended to
+    output_path + ".mismatches.csv" instead of stopping the run.
+    :param csv_path: CSV file with a header line, then one "quiz,solution" line per sudoku
+    :param output_path: .npy file to write solutions to
+    :param chunk_size: Number of sudokus to solve between checkpoints
+    :param processes: Number of worker processes, defaults to the number of CPUs. 1 solves in this process.
+    :param limit: Stop once this many sudokus have been solved in total
+    :return: Progress, including the number of sudokus solved and wrong
+    """
+    checkpoint_path = output_path + ".checkpoint"
+    mismatches_path = output_path + ".mismatches.csv"
+
+    progress = load_checkpoint(checkpoint_path)
+    corpus = {"csv_path": os.path.abspath(csv_path), "csv_size": os.path.getsize(csv_path),
+              "total": count_rows(csv_path)}
+
+    # Hash of every CSV byte read so far, so a resumed run can tell if the lines it already solved have changed
+    digest = hashlib.sha256()
+
+    if progress is None:
+        total = corpus["total"]
+        solved = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.int8, shape=(total, 81))
+
+        with open(csv_path, "rb") as f:
+            f.readline()
+            offset = f.tell()
+            hash_bytes(f, 0, offset, digest)
+
+        with open(mismatches_path, "w") as f:
+            f.write("index,quiz,expected,got\n")
+
+        progress = {"done": 0, "offset": offset, "mismatches": 0,
+                    "mismatches_size": os.path.getsize(mismatches_path), "csv_hash": digest.hexdigest(), **corpus}
+        save_checkpoint(checkpoint_path, progress)
+    else:
+        with open(csv_path, "rb") as f:
+            hash_bytes(f, 0, progress["offset"], digest)
+        corpus["csv_hash"] = digest.hexdigest()
+
+        for key, value in corpus.items():
+            if progress.get(key) != value:
+                raise ValueError(f"Checkpoint {checkpoint_path} was made with {key} {progress.get(key)!r}, "
+                                 f"not {value!r}. Delete it, or use another output_path, to start a new run.")
+
+        for path in (output_path, mismatches_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Can't resume from checkpoint {checkpoint_path}: {path} is missing. "
+                                        f"Delete the checkpoint to start again.")
+
+        solved = np.lib.format.open_memmap(output_path, mode="r+")
+
+        if solved.shape != (progress["total"], 81) or solved.dtype != np.int8:
+            raise ValueError(f"Can't resume from checkpoint {checkpoint_path}: {output_path} has shape "
+                             f"{solved.shape} and dtype {solved.dtype}, not ({progress['total']}, 81) and int8. "
+                             f"Delete the checkpoint to start again.")
+
+        # Drop mismatches written after the checkpoint, they will be found again
+        with open(mismatches_path, "r+") as f:
+            f.truncate(progress["mismatches_size"])
+
+    stop = progress["total"] if limit is None else min(limit, progress["total"])
+    done_at_start = progress["done"]
+    start_time = time.perf_counter()
+
+    pool = None if processes == 1 else Pool(processes)
+    solver = map if pool is None else lambda func, quizzes: pool.imap(func, quizzes, 100)
+
+    try:
+        with open(csv_path, "rb") as f, open(mismatches_path, "a") as mismatches:
+            f.seek(progress["offset"])
+
+            while progress["done"] < stop:
+                quizzes, solutions, valid = read_chunk(f, min(chunk_size, stop - progress["done"]))
+                if len(quizzes) == 0:
+                    break
+
+                first = progress["done"]
+                last = first + len(quizzes)
+                solved[first:last] = -1
+                if valid.any():
+                    solved[first:last][valid] = np.stack(list(solver(_solve_flat, quizzes[valid])))
+                solved.flush()
+
+                # Record wrong solutions, and lines that couldn't be read
+                for i in np.flatnonzero(~valid | (solved[first:last] != solutions).any(axis=1)):
+                    if not valid[i]:
+                        fields = ["", "", "malformed"]
+                    else:
+                        fields = [
+                            "".join(map(str, quizzes[i])),
+                            "".join(map(str, solutions[i])),
+                            "".join(map(str, solved[first + i])) if solved[first + i].min() >= 0 else "unsolved",
+                        ]
+                    mismatches.write(",".join([str(first + i)] + fields) + "\n")
+                    progress["mismatches"] += 1
+                mismatches.flush()
+                os.fsync(mismatches.fileno())
+
+                end = f.tell()
+                hash_bytes(f, progress["offset"], end, digest)
+
+                progress["done"] = last
+                progress["offset"] = end
+                progress["csv_hash"] = digest.hexdigest()
+                progress["mismatches_size"] = mismatches.tell()
+                save_checkpoint(checkpoint_path, progress)
+
+                elapsed = time.perf_counter() - start_time
+                print(f"{progress['done']}/{progress['total']} sudokus solved, {progress['mismatches']} wrong, "
+                      f"{(progress['done'] - done_at_start) / elapsed:.0f} sudokus/sec")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - start_time
+    progress["rate"] = (progress["done"] - done_at_start) / elapsed if elapsed else 0.0
+    return progress
+
+
+if __name__ == "__main__":
+    bulk_solve()
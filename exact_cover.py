@@ -1,7 +1,324 @@
 import numpy as np
 
 
-class SudokuState:
+class SearchStats:
+    """
+    Counters collected by ExactCover.solutions, describing how much work a search took.
+    """
+
+    def __init__(self):
+        # Choice points that had exactly one candidate row (placements forced by propagation)
+        self.forced = 0
+        # Total candidate rows seen at choice points with more than one, i.e. the sum of their branching factors
+        self.candidates = 0
+        # Rows taken back out of the partial solution without leading to a solution
+        self.backtracks = 0
+        # Complete solutions found
+        self.solutions = 0
+
+
+class ExactCover:
+    """
+    Algorithm X over a sparse 0/1 matrix, stored as a dict of column -> set of rows.
+    """
+
+    def __init__(self, rows, columns, secondary=()):
+        """
+        Create a new exact cover problem.
+        :param rows: dict (or list) of row -> list of columns the row covers
+        :param columns: every primary column, which must be covered exactly once
+        :param secondary: secondary columns, which may be covered at most once
+        """
+        self.rows = rows
+        self.solution = []
+        self.secondary = frozenset(secondary)
+
+        # Number of secondary columns still in matrix A
+        self.n_secondary = len(self.secondary)
+
+        # matrix A
+        self.a = {c: set() for c in columns}
+        for c in self.secondary:
+            self.a[c] = set()
+
+        # Populate A with the rows covering each column
+        for row, cols in (rows.items() if isinstance(rows, dict) else enumerate(rows)):
+            for c in cols:
+                self.a[c].add(row)
+
+    @classmethod
+    def from_matrix(cls, rows, secondary=(), n_columns=None):
+        """
+        Create a problem from a sparse 0/1 matrix, given as a column-index list per row.
+        :param rows: list of column-index lists, one per matrix row
+        :param secondary: indices of secondary columns
+        :param n_columns: number of columns, if some are not covered by any row
+        :return: New ExactCover
+        """
+        rows = [[int(c) for c in cols] for cols in rows]
+        secondary = {int(c) for c in secondary}
+
+        if n_columns is None:
+            n_columns = 1 + max((c for cols in rows for c in cols), default=-1)
+            n_columns = max([n_columns] + [c + 1 for c in secondary])
+
+        for i, cols in enumerate(rows):
+            if len(set(cols)) != len(cols):
+                raise ValueError(f"Row {i} lists a column more than once: {cols}")
+            if any(c < 0 or c >= n_columns for c in cols):
+                raise ValueError(f"Row {i} has a column index outside 0-{n_columns - 1}: {cols}")
+
+        if any(c < 0 or c >= n_columns for c in secondary):
+            raise ValueError(f"Secondary column indices must be in 0-{n_columns - 1}")
+
+        primary = [c for c in range(n_columns) if c not in secondary]
+        return cls(rows, primary, secondary)
+
+    @classmethod
+    def from_csr(cls, indptr, indices, secondary=(), n_columns=None):
+        """
+        Create a problem from a sparse 0/1 matrix in CSR form.
+        :param indptr: row i covers the columns indices[indptr[i]:indptr[i + 1]]
+        :param indices: column indices of every non-zero entry
+        :param secondary: indices of secondary columns
+        :param n_columns: number of columns, if some are not covered by any row
+        :return: New ExactCover
+        """
+        indptr = [int(i) for i in indptr]
+        indices = [int(c) for c in indices]
+
+        if not indptr or indptr[0] != 0 or indptr[-1] != len(indices) or \
+                any(a > b for a, b in zip(indptr, indptr[1:])):
+            raise ValueError("indptr must start at 0, never decrease, and end at len(indices)")
+
+        rows = [indices[indptr[i]:indptr[i + 1]] for i in range(len(indptr) - 1)]
+        return cls.from_matrix(rows, secondary, n_columns)
+
+    def cover(self, row):
+        """
+        Removes the columns covered by row, and every other row that conflicts with it
+        :param row: Row to look up
+        :return: list of removed columns
+        """
+        # List of removed columns (so they can be restored later)
+        removed = []
+
+        # For column row covers
+        for c in self.rows[row]:
+
+            # For other row that ALSO covers c
+            for other_row in self.a[c]:
+
+                # For other columns that the other row covers
+                for other_c in self.rows[other_row]:
+
+                    # Remove other_row from the other column
+                    if other_c != c:
+                        self.a[other_c].remove(other_row)
+
+            removed.append(self.a.pop(c))
+
+        if self.secondary:
+            self.n_secondary -= sum(c in self.secondary for c in self.rows[row])
+
+        return removed
+
+    def uncover(self, row, removed):
+        """
+        Undoes the affect of cover. Adds rows back to their columns.
+        :param row: Row that was used to remove columns
+        :param removed: Removed columns to restore
+        :return: None
+        """
+        # removed is an ordered list, so we must work backwards
+        for c in reversed(self.rows[row]):
+            # Get column from list
+            self.a[c] = removed.pop()
+            # For other row that covers c
+            for other_row in self.a[c]:
+                # For other columns that the other row covers
+                for other_c in self.rows[other_row]:
+                    self.a[other_c].add(other_row)
+
+        if self.secondary:
+            self.n_secondary += sum(c in self.secondary for c in self.rows[row])
+
+    def add_solution(self, row):
+        """
+        Add the given row to the solution, and remove conflicting rows from matrix
+        :param row: Row to add to solution
+        :return: Removed columns
+        """
+        self.solution.append(row)
+        return self.cover(row)
+
+    def remove_solution(self, row, removed):
+        """
+        Remove the given row from the solution, and restores conflicting rows to matrix
+        :param row: Row to remove from solution
+        :param removed: Removed columns to restore
+        :return: Updated solution
+        """
+        self.solution.pop()
+        self.uncover(row, removed)
+        return self.solution
+
+    def pick_constraint(self):
+        """
+        Picks the primary column with the fewest rows left to cover it
+        :return: Column, or None if there are no primary columns left
+        """
+        min_n_rows = float('inf')
+        result = None
+
+        # Secondary columns never need to be picked
+        columns = self.a if not self.secondary else (c for c in self.a if c not in self.secondary)
+
+        # For every column
+        for c in columns:
+            # Number of rows covering it
+            n_rows = len(self.a[c])
+
+            # Check if there are fewer than the running minimum
+            if n_rows < min_n_rows:
+
+                # Update minimum and save column
+                min_n_rows = n_rows
+                result = c
+
+                # A column with 0 or 1 rows can't be beaten, so the first one we find will do.
+                if n_rows <= 1:
+                    break
+
+        return result
+
+    def pick_constraint_ordered(self):
+        """
+        Picks the primary column with the fewest rows left to cover it, breaking ties by the columns' own order.
+        Slower than pick_constraint, but the choice doesn't depend on what the search has explored before.
+        :return: Column, or None if there are no primary columns left
+        """
+        columns = self.a if not self.secondary else (c for c in self.a if c not in self.secondary)
+        return min(columns, key=lambda c: (len(self.a[c]), c), default=None)
+
+    def is_goal(self):
+        """
+        Is this state a goal?
+        :return: True if this state is a goal
+        """
+        # A goal state will have no primary columns left to cover in matrix A
+        return len(self.a) == self.n_secondary
+
+    def pick_rows(self, stats: SearchStats = None, ordered: bool = False) -> list:
+        """
+        Picks a column to cover, and lists the rows that could cover it
+        :param stats: Optional SearchStats to update
+        :param ordered: Pick the column and list the rows in sorted order
+        :return: Rows covering the picked column
+        """
+        # Pick a column to cover
+        const = self.pick_constraint_ordered() if ordered else self.pick_constraint()
+
+        # List of rows that cover it
+        candidates = sorted(self.a[const]) if ordered else list(self.a[const])
+
+        if stats is not None:
+            if len(candidates) == 1:
+                stats.forced += 1
+            else:
+                stats.candidates += len(candidates)
+
+        return candidates
+
+    def solutions(self, stats: SearchStats = None, ordered: bool = False):
+        """
+        Generate every exact cover, using Algorithm X.
+        The search keeps its own stack rather than recursing, so covers with any number of rows can be found.
+        The matrix is left at each yielded solution until the generator is resumed.
+        :param stats: Optional SearchStats to update as the search runs
+        :param ordered: Pick columns and try rows in sorted order, so the search is the same on every run
+        :return: Generator of solutions
+        """
+        if self.is_goal():
+            if stats is not None:
+                stats.solutions += 1
+            yield self.solution.copy()
+            return
+
+        # One level per row in the partial solution:
+        # [rows left to try, row being tried, columns it removed, solutions found before trying it]
+        stack = [[iter(self.pick_rows(stats, ordered)), None, None, None]]
+
+        while stack:
+            level = stack[-1]
+
+            # Remove the last row tried from solution and restore the matrix, so that we can try the next row
+            if level[2] is not None:
+                self.remove_solution(level[1], level[2])
+                level[2] = None
+
+                if stats is not None and stats.solutions == level[3]:
+                    stats.backtracks += 1
+
+            for row in level[0]:
+                level[1] = row
+                level[3] = None if stats is None else stats.solutions
+                level[2] = self.add_solution(row)
+                break
+            else:
+                # No rows left to try at this level
+                stack.pop()
+                continue
+
+            if self.is_goal():
+                if stats is not None:
+                    stats.solutions += 1
+                yield self.solution.copy()
+            else:
+                stack.append([iter(self.pick_rows(stats, ordered)), None, None, None])
+
+
+def solve(rows=None, secondary=(), mode: str = "first", csr=None, n_columns=None, limit=None):
+    """
+    Solve a generic exact cover problem, given as a sparse 0/1 matrix.
+    :param rows: list of column-index lists, one per matrix row
+    :param secondary: indices of columns that may be covered at most once
+    :param mode: "first", "all" or "count"
+    :param csr: (indptr, indices) pair, used instead of rows
+    :param n_columns: number of columns, if some are not covered by any row
+    :param limit: maximum number of solutions to find in "all" or "count" mode
+    :return: First solution's row indices (or None), list of every solution, or number of solutions
+    """
+    if mode not in ("first", "all", "count"):
+        raise ValueError(f"Unknown mode {mode!r}, expected 'first', 'all' or 'count'")
+
+    if (rows is None) == (csr is None):
+        raise ValueError("Pass exactly one of rows or csr")
+
+    if limit is not None and mode == "first":
+        raise ValueError("limit can only be used in 'all' or 'count' mode")
+
+    if csr is not None:
+        problem = ExactCover.from_csr(*csr, secondary=secondary, n_columns=n_columns)
+    else:
+        problem = ExactCover.from_matrix(rows, secondary, n_columns)
+
+    found = problem.solutions()
+
+    if mode == "first":
+        solution = next(found, None)
+        return None if solution is None else sorted(solution)
+
+    if limit is not None:
+        found = (solution for _, solution in zip(range(limit), found))
+
+    if mode == "count":
+        return sum(1 for _ in found)
+
+    return [sorted(solution) for solution in found]
+
+
+class SudokuState(ExactCover):
     # dict of constraints, RCV as keys
     get_constraints = {}
 
@@ -37,31 +354,23 @@ class SudokuState:
         Calculates matrix A from passed values
         :param values: 9x9 grid of initial state
         """
-        self.solvable = True
-        self.solution = {}
-        self.values = values
+        super().__init__(
+            SudokuState.get_constraints,
+            # Every cell must contain a value, (col, row)
+            [("Cell", (x, y)) for x in range(9) for y in range(9)] +
 
-        # matrix A
-        self.a = {
-            c: set() for c in (
-                # Every cell must contain a value, (col, row)
-                    [("Cell", (x, y)) for x in range(9) for y in range(9)] +
+            # Every row must contain each value, (row, val)
+            [("Row", (row, val)) for row in range(9) for val in range(1, 10)] +
 
-                    # Every row must contain each value, (row, val)
-                    [("Row", (row, val)) for row in range(9) for val in range(1, 10)] +
-
-                    # Every column must contain each value, (column, val)
-                    [("Col", (col, val)) for col in range(9) for val in range(1, 10)] +
-
-                    # Every block must contain each value, (block, val)
-                    [("Block", (blk, val)) for blk in range(9) for val in range(1, 10)]
-            )
-        }
+            # Every column must contain each value, (column, val)
+            [("Col", (col, val)) for col in range(9) for val in range(1, 10)] +
 
-        # Populate A with the associated RCVs
-        for rcv, consts in SudokuState.get_constraints.items():
-            for c in consts:
-                self.a[c].add(rcv)
+            # Every block must contain each value, (block, val)
+            [("Block", (blk, val)) for blk in range(9) for val in range(1, 10)]
+        )
+        self.solvable = True
+        self.solution = {}
+        self.values = values
 
         # Update constraints to reflect initial state
         for (y, x), value in np.ndenumerate(values):
@@ -77,27 +386,7 @@ class SudokuState:
         :param rcv: Row, Column, Value tuple to look up
         :return: list of removed RCVs
         """
-        # This is pretty nasty, but can't think of another way of doing it. Maybe pd.dataframes?
-
-        # List of removed RCVs (so they can be restored later)
-        removed_rcvs = []
-
-        # For constraint RCV satisfies
-        for c in SudokuState.get_constraints[rcv]:
-
-            # For other RCV that ALSO satisfy c
-            for other_rcv in self.a[c]:
-
-                # For other constraints that the other RCV satisfies
-                for other_c in SudokuState.get_constraints[other_rcv]:
-
-                    # Remove other_rcv from the other constraint
-                    if other_c != c:
-                        self.a[other_c].remove(other_rcv)
-
-            removed_rcvs.append(self.a.pop(c))
-
-        return removed_rcvs
+        return self.cover(rcv)
 
     def restore_rcvs(self, rcv: (int, int, int), removed):
         """
@@ -106,15 +395,7 @@ class SudokuState:
         :param removed: Removed columns to restore
         :return: None
         """
-        # removed is an ordered list, so we must work backwards
-        for c in reversed(SudokuState.get_constraints[rcv]):
-            # Get column from list
-            self.a[c] = removed.pop()
-            # For other rcv that satisfy c
-            for other_rcv in self.a[c]:
-                # For other constraints that the other rcv satisfies
-                for other_c in SudokuState.get_constraints[other_rcv]:
-                    self.a[other_c].add(other_rcv)
+        self.uncover(rcv, removed)
 
     def add_solution(self, rcv: (int, int, int)):
         """
@@ -141,41 +422,6 @@ class SudokuState:
         self.restore_rcvs(rcv, removed)
         return self.solution
 
-    def pick_constraint(self) -> ((str, (int, int, int)), set):
-        """
-        Picks the next non-empty constraint to satisfy
-        :return: Constraint
-        """
-
-        min_n_rcvs = float('inf')
-        result = None
-
-        # For every constraint
-        for c in self.a:
-            # Number of associated RCVs
-            n_rcvs = len(self.a[c])
-
-            # Check if there are fewer than the running minimum
-            if n_rcvs < min_n_rcvs:
-
-                # Update minimum and save constraint
-                min_n_rcvs = n_rcvs
-                result = c
-
-                # 1 is the minimum number of RCVs, so the first one we find will do.
-                if n_rcvs == 1:
-                    break
-
-        return result
-
-    def is_goal(self):
-        """
-        Is this state a goal?
-        :return: True if this state is a goal
-        """
-        # A goal state will have no constraints left to fulfill in matrix A
-        return all(item is None for item in self.a)
-
     def apply_solution(self):
         """
         Blindly apply the solution set to the initial values
@@ -0,0 +1,71 @@
+import exact_cover as ec
+import itertools
+import numpy as np
+from multiprocessing import Pool
+
+# Grades sudokus by how much work Algorithm X needs to solve them, and to prove the solution is unique.
+
+
+def search_stats(puzzle: np.ndarray) -> ec.SearchStats or None:
+    """
+    Search the given sudoku for up to two solutions, collecting statistics on the way.
+    Columns are picked with a fixed tie-break, so the search tree only depends on the sudoku. Searching for a
+    second solution makes the search cover that whole tree for a unique sudoku, so the order candidates are
+    tried in doesn't change the result either.
+    :param puzzle: 9x9 sudoku grid
+    :return: Search statistics, or None if the givens conflict
+    """
+    sudoku_state = ec.SudokuState(puzzle.copy())
+
+    if not sudoku_state.solvable:
+        return None
+
+    stats = ec.SearchStats()
+    for _ in itertools.islice(sudoku_state.solutions(stats, ordered=True), 2):
+        pass
+
+    return stats
+
+
+def rate(puzzle: np.ndarray) -> int or None:
+    """
+    Rate the difficulty of the given sudoku. Higher is harder, and the same sudoku always gets the same score.
+    The score is the number of placements tried: those forced by propagation, plus every candidate at the
+    choice points (the sum of their branching factors, so wider branching costs more), with placements that
+    had to be backtracked counted twice. Dead ends (choice points with no candidates) add nothing on purpose, as
+    reaching one takes no placement and the placement that led there is already counted as a backtrack.
+    :param puzzle: 9x9 sudoku grid
+    :return: Difficulty score, or None if the sudoku has no solution
+    """
+    stats = search_stats(puzzle)
+
+    if stats is None or stats.solutions == 0:
+        return None
+
+    return stats.forced + stats.candidates + stats.backtracks
+
+
+def _rate_or_error(puzzle: np.ndarray) -> int:
+    score = rate(puzzle)
+    return -1 if score is None else score
+
+
+def rate_batch(puzzles, processes: int = None, chunksize: int = 1000) -> np.ndarray:
+    """
+    Rate the difficulty of many sudokus, using a pool of processes.
+    :param puzzles: Array of 9x9 sudoku grids, or an iterable of them
+    :param processes: Number of worker processes, defaults to the number of CPUs. 1 rates in this process.
+    :param chunksize: Number of sudokus sent to a worker at a time
+    :return: Array of scores, with -1 for sudokus that have no solution
+    """
+    if processes == 1:
+        return np.fromiter(map(_rate_or_error, puzzles), dtype=np.int64)
+
+    with Pool(processes) as pool:
+        return np.fromiter(pool.imap(_rate_or_error, puzzles, chunksize), dtype=np.int64)
+
+
+if __name__ == "__main__":
+    for difficulty in ['very_easy', 'easy', 'medium', 'hard']:
+        scores = rate_batch(np.load(f"data/{difficulty}_puzzle.npy"))
+        print(f"{difficulty}: {scores}")
@@ -1,4 +1,12 @@
+import builtins
 import exact_cover as ec
+import os
+import pytest
+import subprocess
+import sys
+import benchmarks
+import bulk_solve
+import rating
 import time
 import numpy as np
 
@@ -137,6 +145,182 @@ def test_extreme():
     print(your_solution)
     print(end_time - start_time)
 
+def test_generic_solver():
+    # Knuth's (2000) example matrix, which has exactly one exact cover
+    rows = [[2, 4, 5], [0, 3, 6], [1, 2, 5], [0, 3], [1, 6], [3, 4, 6]]
+    assert ec.solve(rows) == [0, 3, 4]
+    assert ec.solve(rows, mode="all") == [[0, 3, 4]]
+
+    # The same matrix in CSR form
+    indptr = np.cumsum([0] + [len(cols) for cols in rows])
+    indices = np.concatenate(rows)
+    assert ec.solve(csr=(indptr, indices), mode="count") == 1
+
+    # No exact cover without row 4
+    assert ec.solve(rows[:4] + rows[5:]) is None
+
+    # Covers with more rows than Python's recursion limit
+    deep = [[i] for i in range(5000)]
+    assert ec.solve(deep) == list(range(5000))
+    assert ec.solve(deep + [[0, 1]], mode="count") == 2
+
+    # Bad input
+    for kwargs in [
+        dict(rows=[[0, 0]]),
+        dict(rows=[[0, 2]], n_columns=2),
+        dict(rows=[[-1]]),
+        dict(csr=([0, 2], [0])),
+        dict(),
+        dict(rows=rows, csr=(indptr, indices)),
+        dict(rows=rows, limit=1),
+    ]:
+        with pytest.raises(ValueError):
+            ec.solve(**kwargs)
+
+
+def test_n_queens():
+    rows, secondary = benchmarks.n_queens_rows(8)
+    assert ec.solve(rows, secondary, mode="count") == 92
+    assert ec.solve(rows, secondary, mode="count", limit=10) == 10
+
+    # Without secondary columns, diagonals would have to be covered exactly once
+    assert ec.solve(rows, mode="count") == 0
+
+
+def test_rating():
+    sudokus = np.load("data/hard_puzzle.npy")[:5]
+    scores = rating.rate_batch(sudokus, processes=1)
+
+    assert list(scores) == [rating._rate_or_error(sudoku) for sudoku in sudokus]
+    assert list(scores) == list(rating.rate_batch(sudokus, processes=2, chunksize=2))
+
+    # Givens that conflict can't be rated
+    conflicting = np.zeros((9, 9), dtype=int)
+    conflicting[0, :2] = 1
+    assert rating.rate(conflicting) is None
+
+    # Harder sudokus take more work than easier ones
+    assert rating.rate(np.load("data/very_easy_puzzle.npy")[0]) < rating.rate(sudokus[2])
+
+
+
+def test_rating_deterministic(monkeypatch):
+    sudokus = np.load("data/hard_puzzle.npy")
+    scores = [rating.rate(sudoku) for sudoku in sudokus]
+
+    # Trying candidates in the reverse order doesn't change the scores
+    monkeypatch.setattr(ec, "sorted", lambda rows: builtins.sorted(rows, reverse=True), raising=False)
+    assert [rating.rate(sudoku) for sudoku in sudokus] == scores
+    monkeypatch.undo()
+
+    # Neither does a different hash seed, which changes set and dict iteration order
+    for seed in ("1", "2"):
+        output = subprocess.run(
+            [sys.executable, "-c", "import numpy as np, rating; "
+                                   "print([rating.rate(s) for s in np.load('data/hard_puzzle.npy')])"],
+            env={**os.environ, "PYTHONHASHSEED": seed}, capture_output=True, text=True, check=True
+        ).stdout
+        assert output.strip() == str(scores)
+
+
+def write_corpus(csv_path, quizzes, solutions, extra_lines=()) -> None:
+    csv_path.write_text("quizzes,solutions\n" + "\n".join([
+        "".join(map(str, quiz)) + "," + "".join(map(str, solution)) for quiz, solution in zip(quizzes, solutions)
+    ] + list(extra_lines)) + "\n")
+
+
+def test_bulk_solve(tmp_path):
+    sudokus = np.load("data/very_easy_puzzle.npy").astype(int).reshape(-1, 81)
+    solutions = np.load("data/very_easy_solution.npy").astype(int).reshape(-1, 81)
+
+    # Give the last sudoku a wrong expected solution
+    expected = solutions.copy()
+    expected[-1, :2] = expected[-1, 1::-1]
+
+    csv_path = tmp_path / "sudoku.csv"
+    write_corpus(csv_path, sudokus, expected)
+    output_path = str(tmp_path / "solved.npy")
+
+    # Stop part way through, then resume
+    progress = bulk_solve.bulk_solve(str(csv_path), output_path, chunk_size=4, processes=1, limit=6)
+    assert progress["done"] == 6
+
+    # The same sudokus in another order make a CSV of the same size, which can't be resumed either
+    size = os.path.getsize(csv_path)
+    write_corpus(csv_path, sudokus[::-1], expected[::-1])
+    assert os.path.getsize(csv_path) == size
+    with pytest.raises(ValueError):
+        bulk_solve.bulk_solve(str(csv_path), output_path, chunk_size=4, processes=1)
+    write_corpus(csv_path, sudokus, expected)
+
+    # Nor can a solutions file of the wrong shape
+    solved = np.load(output_path)
+    np.save(output_path, solved[:-1])
+    with pytest.raises(ValueError):
+        bulk_solve.bulk_solve(str(csv_path), output_path, chunk_size=4, processes=1)
+    np.save(output_path, solved)
+
+    progress = bulk_solve.bulk_solve(str(csv_path), output_path, chunk_size=4, processes=1)
+    assert progress["done"] == len(sudokus)
+    assert progress["mismatches"] == 1
+
+    assert np.array_equal(np.load(output_path), solutions)
+    mismatches = open(output_path + ".mismatches.csv").read().splitlines()
+    assert len(mismatches) == 2
+    assert mismatches[1].startswith(f"{len(sudokus) - 1},")
+
+    # A different corpus can't be resumed with the same output
+    write_corpus(csv_path, sudokus[:5], expected[:5])
+    with pytest.raises(ValueError):
+        bulk_solve.bulk_solve(str(csv_path), output_path, processes=1)
+
+
+def test_bulk_solve_killed(tmp_path):
+    sudokus = np.load("data/very_easy_puzzle.npy").astype(int).reshape(-1, 81)
+    solutions = np.load("data/very_easy_solution.npy").astype(int).reshape(-1, 81)
+
+    # Give the first sudoku a wrong expected solution, and end with lines that can't be read
+    expected = solutions.copy()
+    expected[0, :2] = expected[0, 1::-1]
+
+    csv_path = tmp_path / "sudoku.csv"
+    write_corpus(csv_path, sudokus, expected, ["1" * 81 + ",1.0", "x" * 81 + "," + "1" * 81])
+    output_path = str(tmp_path / "solved.npy")
+    checkpoint_path = output_path + ".checkpoint"
+
+    # Save the checkpoint from before the first chunk, then restore it after the chunk's mismatch was written,
+    # as if the run had been killed before checkpointing
+    bulk_solve.bulk_solve(str(csv_path), output_path, processes=1, limit=0)
+    checkpoint = open(checkpoint_path).read()
+    bulk_solve.bulk_solve(str(csv_path), output_path, chunk_size=4, processes=1, limit=4)
+    open(checkpoint_path, "w").write(checkpoint)
+
+    progress = bulk_solve.bulk_solve(str(csv_path), output_path, chunk_size=4, processes=1)
+    assert progress["done"] == len(sudokus) + 2
+    assert progress["mismatches"] == 3
+
+    solved = np.load(output_path)
+    assert np.array_equal(solved[:len(sudokus)], solutions)
+    assert (solved[len(sudokus):] == -1).all()
+
+    mismatches = open(output_path + ".mismatches.csv").read().splitlines()
+    assert [line.split(",")[0] for line in mismatches[1:]] == ["0", str(len(sudokus)), str(len(sudokus) + 1)]
+    assert mismatches[-1].endswith(",malformed")
+
+    # Resuming without the solutions is an error
+    os.remove(output_path)
+    with pytest.raises(FileNotFoundError):
+        bulk_solve.bulk_solve(str(csv_path), output_path, processes=1)
+
+
+def test_bulk_solve_empty(tmp_path):
+    csv_path = tmp_path / "sudoku.csv"
+    csv_path.write_text("")
+
+    progress = bulk_solve.bulk_solve(str(csv_path), str(tmp_path / "solved.npy"), processes=1)
+    assert progress["total"] == 0 and progress["done"] == 0
+
+
 if __name__ == "__main__":
     # solve_fiend()
     # extra_tests()